@@ -1,30 +1,136 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
+from flask.sessions import SessionInterface
 from datetime import datetime, timezone
 import base64
-import json
 import hashlib
 from collections import defaultdict
-import secrets
-import random
 import math
+import os
+import threading
+import itertools
+import time
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+import orjson
+import numpy as np
+
+
+class OrjsonProvider(JSONProvider):
+    """Route request.get_json() and jsonify() through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        # Unlike the stdlib, orjson decodes integers wider than 64 bits as
+        # floats, so such ids are stored and echoed back rounded
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson already emits UTF-8 bytes; skip the str round-trip of dumps()
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
+class NoSessionInterface(SessionInterface):
+    """No endpoint uses sessions; skip loading and signing the session cookie."""
+
+    def open_session(self, app, request):
+        return self.make_null_session(app)
+
+    def save_session(self, app, session, response):
+        pass
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+app.session_interface = NoSessionInterface()
+
+# PROFILE=1 writes a cProfile dump per request for SnakeViz/tuna; off by default
+if os.environ.get('PROFILE'):
+    from werkzeug.middleware.profiler import ProfilerMiddleware
+    profile_dir = os.environ.get('PROFILE_DIR', 'profiler_results')
+    os.makedirs(profile_dir, exist_ok=True)
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app, profile_dir=profile_dir, restrictions=[30])
 
 # Optimized in-memory storage with pre-allocated structures
 voters = {}  # voter_id -> voter_data
-candidates = {}  # candidate_id -> candidate_data
+# Candidates are stored column-wise by registration slot so the results
+# endpoints can rank vote counts with NumPy instead of walking dicts
+cand_index = {}  # candidate_id -> slot
+cand_ids = []  # slot -> candidate_id
+cand_names = []  # slot -> name
+cand_votes = np.zeros(16, dtype=np.int64)  # slot -> votes; capacity >= len(cand_ids)
 votes = {}  # vote_id -> vote_data
-vote_timeline = defaultdict(list)  # candidate_id -> list of votes
+# Listing views, kept in sync on every write so GETs don't re-project records
+voter_projections = {}  # voter_id -> {voter_id, name, age}
+candidate_projections = {}  # candidate_id -> {candidate_id, name, party}
+party_candidates = defaultdict(dict)  # str party -> candidate_id -> projection
+# Encoded GET bodies built from the views above; writers drop them under
+# store_lock and the next read re-encodes
+voters_body = None  # list_voters payload, None when stale
+candidates_body = None  # unfiltered list_candidates payload, None when stale
+party_bodies = {}  # party -> filtered list_candidates payload
+timeline_bodies = {}  # candidate_id -> get_vote_timeline payload
+# candidate_id -> parallel lists of vote timestamps (ISO string and epoch
+# microseconds) and vote ids; cast_vote appends under store_lock and clamps
+# each time to the previous one, so "ts_us" (and "ts") stay sorted for bisect
+vote_timeline = defaultdict(lambda: {"ts": [], "ts_us": [], "vote_ids": []})
 encrypted_ballots = {}  # ballot_id -> encrypted_ballot
+used_nullifiers = set()  # nullifiers of accepted encrypted ballots
 ranked_ballots = defaultdict(list)  # election_id -> list of ranked ballots
 audits = {}  # audit_id -> audit_data
 privacy_budget = {"epsilon": 2.0, "delta": 2e-6}
-vote_counter = 100
-ballot_counter = 7000
-
-# Pre-computed timestamp for performance
-def get_timestamp():
-    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+# Simulated age-bucket counts answered by the DP analytics endpoint
+dp_bucket_labels = ("18-24", "25-34", "35-44", "45-64", "65+")
+dp_base_counts = np.array([10000, 20000, 18000, 17500, 9000], dtype=np.int64)
+dp_rng = np.random.default_rng()
+# Largest float that still casts into int64 (float(2**63 - 1) rounds up to 2**63)
+dp_count_max = float(np.nextafter(2.0 ** 63, 0))
+# Id sequences; next() on itertools.count is a single C call, atomic under the GIL
+vote_id_seq = itertools.count(101)
+ballot_id_seq = itertools.count(7000)
+ranked_ballot_id_seq = itertools.count(1)
+audit_id_seq = itertools.count(1)
+
+# Serializes check-then-write sequences (duplicate ids, has_voted, nullifiers)
+# across the gthread worker's request threads
+store_lock = threading.Lock()
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS" prefix) of the last formatted timestamp
+timestamp_cache = (None, "")
+
+def now_us():
+    return time.time_ns() // 1000
+
+# ISO-8601 UTC with fixed microsecond precision; the date/time prefix is only
+# re-formatted when the second changes
+def get_timestamp(epoch_us=None):
+    global timestamp_cache
+    sec, us = divmod(now_us() if epoch_us is None else epoch_us, 1_000_000)
+    cached_sec, prefix = timestamp_cache
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        timestamp_cache = (sec, prefix)
+    return f"{prefix}.{us:06d}Z"
+
+unix_epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# ISO-8601 query bound -> epoch microseconds, the precision of get_timestamp();
+# naive values are taken as UTC
+@lru_cache(maxsize=1024)
+def parse_timestamp_us(value):
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - unix_epoch
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+# -2 ln(alpha) for the RLA sample size; clients reuse a handful of risk limits
+@lru_cache(maxsize=32)
+def neg2_log(alpha):
+    return -2.0 * math.log(alpha)
 
 # Fast validation functions
 def is_valid_age(age):
@@ -34,11 +140,35 @@ def voter_exists(voter_id):
     return voter_id in voters
 
 def candidate_exists(candidate_id):
-    return candidate_id in candidates
+    return candidate_id in cand_index
+
+# Error responses: bodies are encoded once per message / id and reused; a
+# fresh Response wraps them each time since Flask may mutate its headers
+def json_response(body, status):
+    return app.response_class(body, status=status, mimetype="application/json")
+
+@lru_cache(maxsize=64)
+def message_body(message):
+    return orjson.dumps({"message": message})
+
+@lru_cache(maxsize=4096, typed=True)
+def not_found_body(kind, record_id):
+    return orjson.dumps({"message": f"{kind} with id: {record_id} was not found"})
+
+@lru_cache(maxsize=4096, typed=True)
+def already_voted_body(voter_id):
+    return orjson.dumps({"message": f"voter with id: {voter_id} has already voted"})
+
+def error_response(message, status):
+    return json_response(message_body(message), status)
+
+def not_found(kind, record_id):
+    return json_response(not_found_body(kind, record_id), 417)
 
 # Q1: POST - Create Voter
 @app.route('/api/voters', methods=['POST'])
 def create_voter():
+    global voters_body
     data = request.get_json()
 
     voter_id = data.get('voter_id')
@@ -47,22 +177,25 @@ def create_voter():
 
     # Check required fields
     if voter_id is None or name is None or age is None:
-        return jsonify({"message": "missing required field(s)"}), 422
+        return error_response("missing required field(s)", 422)
 
-    if voter_id in voters:
-        return jsonify({"message": f"voter with id: {voter_id} already exists"}), 409
+    with store_lock:
+        if voter_id in voters:
+            return jsonify({"message": f"voter with id: {voter_id} already exists"}), 409
 
-    if not is_valid_age(age):
-        return jsonify({"message": f"invalid age: {age}, must be 18 or older"}), 422
+        if not is_valid_age(age):
+            return jsonify({"message": f"invalid age: {age}, must be 18 or older"}), 422
 
-    voter = {
-        "voter_id": voter_id,
-        "name": name,
-        "age": age,
-        "has_voted": False,
-        "profile_updated": False  # for weighted votes
-    }
-    voters[voter_id] = voter
+        voter = {
+            "voter_id": voter_id,
+            "name": name,
+            "age": age,
+            "has_voted": False,
+            "profile_updated": False  # for weighted votes
+        }
+        voters[voter_id] = voter
+        voter_projections[voter_id] = {"voter_id": voter_id, "name": name, "age": age}
+        voters_body = None
 
     return jsonify(voter), 218
 
@@ -70,27 +203,31 @@ def create_voter():
 # Q2: GET - Get Voter Info
 @app.route('/api/voters/<int:voter_id>')
 def get_voter(voter_id):
-    if not voter_exists(voter_id):
-        return jsonify({"message": f"voter with id: {voter_id} was not found"}), 417
+    voter = voters.get(voter_id)
+    if voter is None:
+        return not_found("voter", voter_id)
 
-    return jsonify(voters[voter_id]), 222
+    return jsonify(voter), 222
 
 # Q3: GET - List All Voters
 @app.route('/api/voters')
 def list_voters():
-    voter_list = [{
-        "voter_id": v["voter_id"],
-        "name": v["name"],
-        "age": v["age"]
-    } for v in voters.values()]
+    global voters_body
+    body = voters_body
+    if body is None:
+        with store_lock:
+            if voters_body is None:
+                voters_body = orjson.dumps({"voters": list(voter_projections.values())})
+            body = voters_body
 
-    return jsonify({"voters": voter_list}), 223
+    return json_response(body, 223)
 
 # Q4: PUT - Update Voter Info
 @app.route('/api/voters/<int:voter_id>', methods=['PUT'])
 def update_voter(voter_id):
+    global voters_body
     if not voter_exists(voter_id):
-        return jsonify({"message": f"voter with id: {voter_id} was not found"}), 417
+        return not_found("voter", voter_id)
 
     data = request.get_json()
     age = data.get('age')
@@ -98,96 +235,139 @@ def update_voter(voter_id):
     if age is not None and not is_valid_age(age):
         return jsonify({"message": f"invalid age: {age}, must be 18 or older"}), 422
 
-    voter = voters[voter_id]
-    if 'name' in data:
-        voter['name'] = data['name']
-    if age is not None:
-        voter['age'] = age
+    with store_lock:
+        # Re-check under the lock: a concurrent delete may have landed
+        voter = voters.get(voter_id)
+        if voter is None:
+            return not_found("voter", voter_id)
+
+        projection = voter_projections[voter_id]
+        if 'name' in data:
+            voter['name'] = projection['name'] = data['name']
+        if age is not None:
+            voter['age'] = projection['age'] = age
+        voters_body = None
 
     return jsonify(voter), 224
 
 # Q5: DELETE - Delete Voter
 @app.route('/api/voters/<int:voter_id>', methods=['DELETE'])
 def delete_voter(voter_id):
-    if not voter_exists(voter_id):
-        return jsonify({"message": f"voter with id: {voter_id} was not found"}), 417
-
-    del voters[voter_id]
+    global voters_body
+    with store_lock:
+        if not voter_exists(voter_id):
+            return not_found("voter", voter_id)
+
+        del voters[voter_id]
+        del voter_projections[voter_id]
+        voters_body = None
     return jsonify({"message": f"voter with id: {voter_id} deleted successfully"}), 225
 
 # Q6: POST - Register Candidate
 @app.route('/api/candidates', methods=['POST'])
 def register_candidate():
+    global cand_votes, candidates_body
     data = request.get_json()
 
     candidate_id = data.get('candidate_id')
     name = data.get('name')
     party = data.get('party')
 
-    if candidate_id in candidates:
-        return jsonify({"message": f"candidate with id: {candidate_id} already exists"}), 409
+    with store_lock:
+        if candidate_id in cand_index:
+            return jsonify({"message": f"candidate with id: {candidate_id} already exists"}), 409
 
-    candidate = {
-        "candidate_id": candidate_id,
-        "name": name,
-        "party": party,
-        "votes": 0
-    }
-    candidates[candidate_id] = candidate
+        candidate = {
+            "candidate_id": candidate_id,
+            "name": name,
+            "party": party,
+            "votes": 0
+        }
+        slot = len(cand_ids)
+        if slot == cand_votes.size:
+            cand_votes = np.concatenate((cand_votes, np.zeros(slot, dtype=np.int64)))
+        cand_index[candidate_id] = slot
+        cand_ids.append(candidate_id)
+        cand_names.append(name)
+        projection = {"candidate_id": candidate_id, "name": name, "party": party}
+        candidate_projections[candidate_id] = projection
+        candidates_body = None
+        # ?party= filters are always strings, so other party values (possibly
+        # unhashable) can never match and are not indexed
+        if isinstance(party, str):
+            party_candidates[party][candidate_id] = projection
+            party_bodies.pop(party, None)
 
     return jsonify(candidate), 226
 
 # Q7: GET - List Candidates & Q10: Filter by Party
 @app.route('/api/candidates')
 def list_candidates():
+    global candidates_body
     party_filter = request.args.get('party')
 
     if party_filter:
-        candidate_list = [{
-            "candidate_id": c["candidate_id"],
-            "name": c["name"],
-            "party": c["party"]
-        } for c in candidates.values() if c['party'] == party_filter]
-        return jsonify({"candidates": candidate_list}), 230
+        body = party_bodies.get(party_filter)
+        if body is None:
+            with store_lock:
+                party = party_candidates.get(party_filter)
+                body = orjson.dumps({"candidates": list(party.values()) if party else []})
+                # Only cache registered parties so arbitrary filters can't grow the cache
+                if party:
+                    party_bodies[party_filter] = body
+        return json_response(body, 230)
     else:
-        candidate_list = [{
-            "candidate_id": c["candidate_id"],
-            "name": c["name"],
-            "party": c["party"]
-        } for c in candidates.values()]
-        return jsonify({"candidates": candidate_list}), 227
+        body = candidates_body
+        if body is None:
+            with store_lock:
+                if candidates_body is None:
+                    candidates_body = orjson.dumps({"candidates": list(candidate_projections.values())})
+                body = candidates_body
+        return json_response(body, 227)
 
 # Q8: POST - Cast Vote
 @app.route('/api/votes', methods=['POST'])
 def cast_vote():
-    global vote_counter
     data = request.get_json()
 
     voter_id = data.get('voter_id')
     candidate_id = data.get('candidate_id')
 
-    if not voter_exists(voter_id):
-        return jsonify({"message": f"voter with id: {voter_id} was not found"}), 417
-
-    if not candidate_exists(candidate_id):
-        return jsonify({"message": f"candidate with id: {candidate_id} was not found"}), 417
-
-    if voters[voter_id]['has_voted']:
-        return jsonify({"message": f"voter with id: {voter_id} has already voted"}), 423
-
-    vote_counter += 1
-    timestamp = get_timestamp()
-    vote = {
-        "vote_id": vote_counter,
-        "voter_id": voter_id,
-        "candidate_id": candidate_id,
-        "timestamp": timestamp
-    }
+    with store_lock:
+        # One lookup per record; later writes reuse voter and slot
+        voter = voters.get(voter_id)
+        if voter is None:
+            return not_found("voter", voter_id)
+
+        slot = cand_index.get(candidate_id)
+        if slot is None:
+            return not_found("candidate", candidate_id)
+
+        if voter['has_voted']:
+            return json_response(already_voted_body(voter_id), 423)
+
+        vote_id = next(vote_id_seq)
+        timeline = vote_timeline[candidate_id]
+        # The wall clock can step backwards (NTP); never record a vote before
+        # the candidate's previous one so the bisect columns stay sorted
+        cast_us = now_us()
+        if timeline["ts_us"] and cast_us < timeline["ts_us"][-1]:
+            cast_us = timeline["ts_us"][-1]
+        timestamp = get_timestamp(cast_us)
+        vote = {
+            "vote_id": vote_id,
+            "voter_id": voter_id,
+            "candidate_id": candidate_id,
+            "timestamp": timestamp
+        }
 
-    votes[vote_counter] = vote
-    voters[voter_id]['has_voted'] = True
-    candidates[candidate_id]['votes'] += 1
-    vote_timeline[candidate_id].append({"vote_id": vote_counter, "timestamp": timestamp})
+        votes[vote_id] = vote
+        voter['has_voted'] = True
+        cand_votes[slot] += 1
+        timeline["ts"].append(timestamp)
+        timeline["ts_us"].append(cast_us)
+        timeline["vote_ids"].append(vote_id)
+        timeline_bodies.pop(candidate_id, None)
 
     return jsonify(vote), 228
 
@@ -195,36 +375,44 @@ def cast_vote():
 @app.route('/api/candidates/<int:candidate_id>/votes')
 def get_candidate_votes(candidate_id):
     if not candidate_exists(candidate_id):
-        return jsonify({"message": f"candidate with id: {candidate_id} was not found"}), 417
+        return not_found("candidate", candidate_id)
 
     return jsonify({
         "candidate_id": candidate_id,
-        "votes": candidates[candidate_id]['votes']
+        "votes": int(cand_votes[cand_index[candidate_id]])
     }), 229
 
 # Q11: GET - Voting Results (Leaderboard)
 @app.route('/api/results')
 def get_results():
-    results = sorted([{
-        "candidate_id": c["candidate_id"],
-        "name": c["name"],
-        "votes": c["votes"]
-    } for c in candidates.values()], key=lambda x: x['votes'], reverse=True)
+    with store_lock:
+        counts = cand_votes[:len(cand_ids)].copy()
+
+    # Stable sort keeps ties in registration order
+    order = np.argsort(-counts, kind='stable')
+    results = [{
+        "candidate_id": cand_ids[slot],
+        "name": cand_names[slot],
+        "votes": count
+    } for slot, count in zip(order.tolist(), counts[order].tolist())]
 
     return jsonify({"results": results}), 231
 
 # Q12: GET - Winning Candidate
 @app.route('/api/results/winner')
 def get_winner():
-    if not candidates:
+    with store_lock:
+        counts = cand_votes[:len(cand_ids)].copy()
+
+    if not counts.size:
         return jsonify({"winners": []}), 232
 
-    max_votes = max(c['votes'] for c in candidates.values())
+    max_votes = int(counts.max())
     winners = [{
-        "candidate_id": c["candidate_id"],
-        "name": c["name"],
-        "votes": c["votes"]
-    } for c in candidates.values() if c['votes'] == max_votes]
+        "candidate_id": cand_ids[slot],
+        "name": cand_names[slot],
+        "votes": max_votes
+    } for slot in np.flatnonzero(counts == max_votes).tolist()]
 
     return jsonify({"winners": winners}), 232
 
@@ -234,45 +422,56 @@ def get_vote_timeline():
     candidate_id = request.args.get('candidate_id', type=int)
 
     if not candidate_exists(candidate_id):
-        return jsonify({"message": f"candidate with id: {candidate_id} was not found"}), 417
+        return not_found("candidate", candidate_id)
 
-    return jsonify({
-        "candidate_id": candidate_id,
-        "timeline": vote_timeline[candidate_id]
-    }), 233
+    body = timeline_bodies.get(candidate_id)
+    if body is None:
+        with store_lock:
+            timeline = vote_timeline.get(candidate_id)
+            body = timeline_bodies[candidate_id] = orjson.dumps({
+                "candidate_id": candidate_id,
+                "timeline": [{"vote_id": vote_id, "timestamp": ts}
+                             for vote_id, ts in zip(timeline["vote_ids"], timeline["ts"])]
+                            if timeline else []
+            })
+
+    return json_response(body, 233)
 
 # Q14: POST - Conditional Vote Weight
 @app.route('/api/votes/weighted', methods=['POST'])
 def cast_weighted_vote():
-    global vote_counter
     data = request.get_json()
 
     voter_id = data.get('voter_id')
     candidate_id = data.get('candidate_id')
 
-    if not voter_exists(voter_id):
-        return jsonify({"message": f"voter with id: {voter_id} was not found"}), 417
+    with store_lock:
+        # One lookup per record; later writes reuse voter and slot
+        voter = voters.get(voter_id)
+        if voter is None:
+            return not_found("voter", voter_id)
 
-    if not candidate_exists(candidate_id):
-        return jsonify({"message": f"candidate with id: {candidate_id} was not found"}), 417
+        slot = cand_index.get(candidate_id)
+        if slot is None:
+            return not_found("candidate", candidate_id)
 
-    if voters[voter_id]['has_voted']:
-        return jsonify({"message": f"voter with id: {voter_id} has already voted"}), 423
+        if voter['has_voted']:
+            return json_response(already_voted_body(voter_id), 423)
 
-    # Weight = 2 if voter profile updated, 1 otherwise (simplified logic)
-    weight = 2 if len(voters[voter_id]['name']) > 5 else 1
+        # Weight = 2 if voter profile updated, 1 otherwise (simplified logic)
+        weight = 2 if len(voter['name']) > 5 else 1
 
-    vote_counter += 1
-    vote = {
-        "vote_id": vote_counter,
-        "voter_id": voter_id,
-        "candidate_id": candidate_id,
-        "weight": weight
-    }
+        vote_id = next(vote_id_seq)
+        vote = {
+            "vote_id": vote_id,
+            "voter_id": voter_id,
+            "candidate_id": candidate_id,
+            "weight": weight
+        }
 
-    votes[vote_counter] = vote
-    voters[voter_id]['has_voted'] = True
-    candidates[candidate_id]['votes'] += weight
+        votes[vote_id] = vote
+        voter['has_voted'] = True
+        cand_votes[slot] += weight
 
     return jsonify(vote), 234
 
@@ -284,14 +483,22 @@ def get_range_votes():
     to_time = request.args.get('to')
 
     if not candidate_exists(candidate_id):
-        return jsonify({"message": f"candidate with id: {candidate_id} was not found"}), 417
+        return not_found("candidate", candidate_id)
+
+    try:
+        from_us = parse_timestamp_us(from_time)
+        to_us = parse_timestamp_us(to_time)
+    except (AttributeError, ValueError):
+        return error_response("invalid timestamp(s)", 422)
 
-    if from_time >= to_time:
-        return jsonify({"message": "invalid interval: from > to"}), 424
+    if from_us >= to_us:
+        return error_response("invalid interval: from > to", 424)
 
     # Count votes in time range
-    votes_in_range = sum(1 for v in vote_timeline[candidate_id]
-                        if from_time <= v['timestamp'] <= to_time)
+    # .get() so only cast_vote ever inserts a timeline
+    timeline = vote_timeline.get(candidate_id)
+    ts_us = timeline["ts_us"] if timeline else []
+    votes_in_range = bisect_right(ts_us, to_us) - bisect_left(ts_us, from_us)
 
     return jsonify({
         "candidate_id": candidate_id,
@@ -303,7 +510,6 @@ def get_range_votes():
 # Q16: POST - End-to-End Verifiable Encrypted Ballot
 @app.route('/api/ballots/encrypted', methods=['POST'])
 def encrypted_ballot():
-    global ballot_counter
     data = request.get_json()
 
     election_id = data.get('election_id')
@@ -315,29 +521,33 @@ def encrypted_ballot():
 
     # Simulate ZK proof verification (simplified)
     if not zk_proof or len(zk_proof) < 10:
-        return jsonify({"message": "invalid zk proof"}), 425
-
-    # Check nullifier uniqueness
-    for ballot in encrypted_ballots.values():
-        if ballot.get('nullifier') == nullifier:
-            return jsonify({"message": "double voting detected"}), 409
-
-    ballot_id = f"b_{hex(ballot_counter)[2:]}"
-    ballot_counter += 1
-
-    ballot = {
-        "ballot_id": ballot_id,
-        "election_id": election_id,
-        "ciphertext": ciphertext,
-        "zk_proof": zk_proof,
-        "voter_pubkey": voter_pubkey,
-        "nullifier": nullifier,
-        "signature": signature,
-        "status": "accepted",
-        "anchored_at": get_timestamp()
-    }
+        return error_response("invalid zk proof", 425)
+
+    # Lists/objects can't go in the nullifier set; any other JSON scalar can
+    if nullifier is None or isinstance(nullifier, (list, dict)):
+        return error_response("invalid nullifier", 422)
+
+    with store_lock:
+        # Check nullifier uniqueness
+        if nullifier in used_nullifiers:
+            return error_response("double voting detected", 409)
+
+        ballot_id = f"b_{next(ballot_id_seq):x}"
+
+        ballot = {
+            "ballot_id": ballot_id,
+            "election_id": election_id,
+            "ciphertext": ciphertext,
+            "zk_proof": zk_proof,
+            "voter_pubkey": voter_pubkey,
+            "nullifier": nullifier,
+            "signature": signature,
+            "status": "accepted",
+            "anchored_at": get_timestamp()
+        }
 
-    encrypted_ballots[ballot_id] = ballot
+        encrypted_ballots[ballot_id] = ballot
+        used_nullifiers.add(nullifier)
 
     return jsonify({
         "ballot_id": ballot_id,
@@ -347,6 +557,23 @@ def encrypted_ballot():
     }), 236
 
 # Q17: POST - Homomorphic Tally With Verifiable Decryption
+# The simulated tally never changes, so encode it once and only splice in
+# the requested election_id per request
+homomorphic_tally_template = orjson.dumps({
+    "election_id": "__ELECTION_ID__",
+    "encrypted_tally_root": "0x9ab3ef82c1d4567890abcdef1234567890abcdef1234567890abcdef12345678",
+    "candidate_tallies": [
+        {"candidate_id": 1, "votes": 40321},
+        {"candidate_id": 2, "votes": 39997}
+    ],
+    "decryption_proof": base64.b64encode(b"mock_batch_proof_data").decode(),
+    "transparency": {
+        "ballot_merkle_root": "0x5d2c91a4b3e6f7c8d9e0f1a2b3c4d5e6f7a8b9c0d1e2f3a4b5c6d7e8f9a0b1c2",
+        "tally_method": "threshold_paillier",
+        "threshold": "3-of-5"
+    }
+})
+
 @app.route('/api/results/homomorphic', methods=['POST'])
 def homomorphic_tally():
     data = request.get_json()
@@ -354,25 +581,9 @@ def homomorphic_tally():
     election_id = data.get('election_id')
     trustee_shares = data.get('trustee_decrypt_shares', [])
 
-    # Simulate homomorphic tallying
-    candidate_tallies = [
-        {"candidate_id": 1, "votes": 40321},
-        {"candidate_id": 2, "votes": 39997}
-    ]
+    body = homomorphic_tally_template.replace(b'"__ELECTION_ID__"', orjson.dumps(election_id), 1)
 
-    result = {
-        "election_id": election_id,
-        "encrypted_tally_root": "0x9ab3ef82c1d4567890abcdef1234567890abcdef1234567890abcdef12345678",
-        "candidate_tallies": candidate_tallies,
-        "decryption_proof": base64.b64encode(b"mock_batch_proof_data").decode(),
-        "transparency": {
-            "ballot_merkle_root": "0x5d2c91a4b3e6f7c8d9e0f1a2b3c4d5e6f7a8b9c0d1e2f3a4b5c6d7e8f9a0b1c2",
-            "tally_method": "threshold_paillier",
-            "threshold": "3-of-5"
-        }
-    }
-
-    return jsonify(result), 237
+    return json_response(body, 237)
 
 # Q18: POST - Differential-Privacy Analytics
 @app.route('/api/analytics/dp', methods=['POST'])
@@ -384,20 +595,12 @@ def dp_analytics():
     epsilon = data.get('epsilon', 0.5)
     delta = data.get('delta', 1e-6)
 
-    # Simulate differential privacy analysis
-    base_counts = {
-        "18-24": 10000,
-        "25-34": 20000,
-        "35-44": 18000,
-        "45-64": 17500,
-        "65+": 9000
-    }
-
     # Add Gaussian noise for differential privacy
-    noisy_answer = {}
-    for bucket, count in base_counts.items():
-        noise = random.gauss(0, math.sqrt(2 * math.log(1.25/delta)) / epsilon)
-        noisy_answer[bucket] = max(0, int(count + noise))
+    sigma = math.sqrt(2 * math.log(1.25/delta)) / epsilon
+    noise = dp_rng.standard_normal(dp_base_counts.size) * sigma
+    # Clamp in float first: huge sigmas would otherwise overflow the int64 cast
+    noisy = np.clip(dp_base_counts + noise, 0, dp_count_max).astype(np.int64)
+    noisy_answer = dict(zip(dp_bucket_labels, noisy.tolist()))
 
     privacy_budget["epsilon"] -= epsilon
 
@@ -422,7 +625,7 @@ def ranked_ballot():
     ranking = data.get('ranking')
     timestamp = data.get('timestamp')
 
-    ballot_id = f"rb_{random.randint(1000, 9999)}"
+    ballot_id = f"rb_{next(ranked_ballot_id_seq):x}"
 
     ballot = {
         "ballot_id": ballot_id,
@@ -441,6 +644,9 @@ def ranked_ballot():
     }), 239
 
 # Q20: POST - Risk-Limiting Audit (RLA)
+# Simulated stratified sampling plan, base64-encoded once at import
+audit_sampling_plan = base64.b64encode(b"county,proportion,seed\nA,0.4,12345\nB,0.35,23456\nC,0.25,34567").decode()
+
 @app.route('/api/audits/plan', methods=['POST'])
 def audit_plan():
     data = request.get_json()
@@ -451,18 +657,20 @@ def audit_plan():
     audit_type = data.get('audit_type')
     stratification = data.get('stratification')
 
-    audit_id = f"rla_{hex(random.randint(0x1000, 0xffff))[2:]}"
+    audit_id = f"rla_{next(audit_id_seq):x}"
 
     # Calculate initial sample size using statistical formulas
+    # -2 ln(alpha) / margin^2 with margin = diff / total, without the
+    # intermediate division and power
     total_votes = sum(tally['votes'] for tally in reported_tallies)
-    margin = abs(reported_tallies[0]['votes'] - reported_tallies[1]['votes']) / total_votes
-    initial_sample_size = int(math.ceil(-2 * math.log(risk_limit_alpha) / (margin ** 2)))
+    diff = abs(reported_tallies[0]['votes'] - reported_tallies[1]['votes'])
+    initial_sample_size = math.ceil(neg2_log(risk_limit_alpha) * total_votes * total_votes / (diff * diff))
 
     audit = {
         "audit_id": audit_id,
         "election_id": election_id,
         "initial_sample_size": min(initial_sample_size, 1200),
-        "sampling_plan": base64.b64encode(b"county,proportion,seed\nA,0.4,12345\nB,0.35,23456\nC,0.25,34567").decode(),
+        "sampling_plan": audit_sampling_plan,
         "test": "kaplan-markov",
         "status": "planned",
         "risk_limit": risk_limit_alpha,
@@ -478,7 +686,3 @@ def audit_plan():
         "test": "kaplan-markov",
         "status": "planned"
     }), 240
-
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
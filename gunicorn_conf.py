@@ -0,0 +1,18 @@
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+
+# All voter/candidate/vote state lives in app.py module globals, so it is
+# only consistent inside a single process. Scale with threads, not workers,
+# until that state moves to a shared store.
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 5))
+
+# cProfile allows one active profiler per interpreter on Python 3.12+, so
+# overlapping profiled requests would fail; serve them one at a time
+if os.environ.get("PROFILE"):
+    threads = 1
+
+# Import app.py once in the master so workers fork with it already loaded
+preload_app = True